@@ -0,0 +1,17 @@
+# gunicorn_conf.py
+
+# ===========================
+# Gunicorn Configuration for the Status Page
+# ===========================
+
+# Run with: gunicorn -c gunicorn_conf.py status_page:app
+
+# Listen on all interfaces on the same port the development server used
+bind = '0.0.0.0:5000'
+
+# A single worker process keeps the in-process page cache shared by every request
+workers = 1
+
+# Threaded worker: concurrent requests overlap their SQLite reads, which WAL allows
+worker_class = 'gthread'
+threads = 8
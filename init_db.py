@@ -1,111 +1,118 @@
 # init_db.py
 
-import os
 import sqlite3
 import logging
 from pathlib import Path
-
-# ===========================
-# Configuration and Setup
-# ===========================
-
-# Define the mount point for the USB memory stick
-USB_MOUNT_POINT =  '/mnt/usb'  # Updated mount point
-
-# Define the directory within your project to store log files
-PROJECT_LOGS_DIR = os.path.expanduser('~/projects/network-monitoring/logs')
-
-# Define the paths for the SQLite database on both USB and microSD card
-DB_PATH_USB = os.path.join(USB_MOUNT_POINT, 'downtime_logs.db')  # Database path on USB
-DB_PATH_SD = os.path.join(PROJECT_LOGS_DIR, 'downtime_logs.db')  # Database path on microSD
-
-# Define the paths for the log files on both USB and microSD card
-LOG_PATH_USB = os.path.join(PROJECT_LOGS_DIR, 'init_db_usb.log')  # Log file on USB
-LOG_PATH_SD = os.path.join(PROJECT_LOGS_DIR, 'init_db_sd.log')    # Log file on microSD
-
-# ===========================
-# Ensure Logs Directory Exists
-# ===========================
-
-try:
-    print(f"Creating logs directory at {PROJECT_LOGS_DIR}.")
-    Path(PROJECT_LOGS_DIR).mkdir(parents=True, exist_ok=True)
-    print(f"Logs directory created at {PROJECT_LOGS_DIR}.")
-except Exception as e:
-    print(f"ERROR: Failed to create logs directory at {PROJECT_LOGS_DIR}: {e}")
+from storage import USB_AVAILABLE, USB_MOUNT_POINT, DB_PATH, get_logger, connect, transaction
 
 # ===========================
 # Configure Logging
 # ===========================
 
-# Initialize a logger with the name 'init_db'
+# Default logger for the schema functions; its file handler is only attached when the script
+# is run directly, so importing the schema code (as monitor.py does) opens no log file or thread
+# Callers such as monitor.py pass their own logger instead
 logger = logging.getLogger('init_db')
 
-# Set the logging level to DEBUG to capture all levels of log messages
-logger.setLevel(logging.DEBUG)
-
-# Create a formatter that includes timestamp, log level, and message
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
 # ===========================
-# Create Logging Handlers Based on USB Availability
+# Define the Database Schema
 # ===========================
 
-if Path(USB_MOUNT_POINT).exists():
-    # USB is mounted and available
-
-    # Define the log file path on the USB
-    usb_log_file = LOG_PATH_USB
-
-    try:
-        # Create a FileHandler to write logs to the USB log file
-        usb_log_handler = logging.FileHandler(usb_log_file)
-        usb_log_handler.setLevel(logging.DEBUG)  # Capture all log levels
-
-        # Apply the formatter to the handler
-        usb_log_handler.setFormatter(formatter)
-
-        # Add the USB FileHandler to the logger
-        logger.addHandler(usb_log_handler)
+# Schema objects as (name, SQL) pairs, in creation order
+# Timestamps are stored as INTEGER Unix epoch seconds
+SCHEMA = (
+    ('downtime', '''
+        CREATE TABLE IF NOT EXISTS downtime (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interface TEXT NOT NULL,
+            down_time INTEGER NOT NULL,
+            up_time INTEGER,
+            duration INTEGER
+        )
+    '''),
+    # Index for the status page's time-window queries
+    ('idx_downtime_down_time', '''
+        CREATE INDEX IF NOT EXISTS idx_downtime_down_time ON downtime(down_time)
+    '''),
+    # Partial index covering only open outages, used to resume them after a restart
+    ('idx_downtime_open', '''
+        CREATE INDEX IF NOT EXISTS idx_downtime_open ON downtime(interface, id) WHERE up_time IS NULL
+    '''),
+    # Daily summary of downtime, filled in by the monitor's rollup of older records
+    ('downtime_daily', '''
+        CREATE TABLE IF NOT EXISTS downtime_daily (
+            day TEXT PRIMARY KEY,
+            count INTEGER NOT NULL,
+            total_duration INTEGER NOT NULL
+        )
+    '''),
+    # View that presents the timestamps in local time for manual queries
+    ('downtime_human', '''
+        CREATE VIEW IF NOT EXISTS downtime_human AS
+        SELECT id,
+               interface,
+               datetime(down_time, 'unixepoch', 'localtime') AS down_time,
+               datetime(up_time, 'unixepoch', 'localtime') AS up_time,
+               duration
+        FROM downtime
+    '''),
+)
 
-        # Log an informational message indicating that logging is directed to the USB
-        logger.info("Logging to USB memory stick.")
-        print("Logging to USB memory stick.")
-    except Exception as e:
-        print(f"ERROR: Failed to set up USB logging: {e}")
-else:
-    # USB is not mounted; fallback to logging on the microSD card
-
-    # Define the log file path on the microSD card
-    sd_log_file = LOG_PATH_SD
-
-    try:
-        # Create a FileHandler to write logs to the microSD log file
-        sd_log_handler = logging.FileHandler(sd_log_file)
-        sd_log_handler.setLevel(logging.WARNING)  # Capture WARNING and above
-
-        # Apply the formatter to the handler
-        sd_log_handler.setFormatter(formatter)
+# ===========================
+# Define the Schema Migration Function
+# ===========================
 
-        # Add the microSD FileHandler to the logger
-        logger.addHandler(sd_log_handler)
+def migrate_text_timestamps(conn, logger=logger):
+    """
+    Convert a 'downtime' table created with TEXT timestamps to INTEGER Unix epoch seconds.
+    Legacy rows stored local time formatted as '%Y-%m-%d %H:%M:%S'. Values that are
+    already all digits were written as epoch seconds by a newer monitor before the
+    migration ran; they are copied as they are instead of being parsed as dates.
 
-        # Log a warning message indicating that USB is unavailable and logging is on microSD
-        logger.warning(f"USB mount point {USB_MOUNT_POINT} does not exist. Logging to microSD card.")
-        print(f"WARNING: USB mount point {USB_MOUNT_POINT} does not exist. Logging to microSD card.")
-    except Exception as e:
-        print(f"ERROR: Failed to set up microSD logging: {e}")
+    Parameters:
+    - conn (sqlite3.Connection): An open connection to the database.
+    - logger (logging.Logger): The logger that records the migration.
+    """
+    columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(downtime)")}
+    if columns.get('down_time', '').upper() != 'TEXT':
+        # Table is missing or already uses INTEGER timestamps
+        return
+
+    logger.info("Migrating 'downtime' timestamps from TEXT to INTEGER epoch seconds.")
+    conn.executescript('''
+        BEGIN;
+        ALTER TABLE downtime RENAME TO downtime_legacy;
+        CREATE TABLE downtime (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interface TEXT NOT NULL,
+            down_time INTEGER NOT NULL,
+            up_time INTEGER,
+            duration INTEGER
+        );
+        INSERT INTO downtime (id, interface, down_time, up_time, duration)
+            SELECT id, interface,
+                   CASE WHEN down_time NOT GLOB '*[^0-9]*' THEN CAST(down_time AS INTEGER)
+                        ELSE CAST(strftime('%s', down_time, 'utc') AS INTEGER) END,
+                   CASE WHEN up_time NOT GLOB '*[^0-9]*' THEN CAST(up_time AS INTEGER)
+                        ELSE CAST(strftime('%s', up_time, 'utc') AS INTEGER) END,
+                   duration
+            FROM downtime_legacy;
+        DROP TABLE downtime_legacy;
+        COMMIT;
+    ''')
 
 # ===========================
 # Define the Database Initialization Function
 # ===========================
 
-def initialize_database(db_path):
+def initialize_database(db_path, logger=logger):
     """
-    Initialize the SQLite database and create the 'downtime' table if it doesn't exist.
+    Initialize the SQLite database and create the 'downtime' table and its
+    related schema objects if they don't exist.
 
     Parameters:
     - db_path (str): The file path to the SQLite database.
+    - logger (logging.Logger): The logger that records the initialization.
     """
     try:
         # Ensure the directory for the database exists
@@ -119,25 +126,32 @@ def initialize_database(db_path):
 
         # Connect to SQLite database at the specified path
         # If the database file doesn't exist, SQLite will create it
-        conn = sqlite3.connect(db_path)
+        # The shared connect() switches to WAL before the schema is written,
+        # so the WAL flag is persisted in the database header for every later connection
+        conn = connect(db_path)
         c = conn.cursor()  # Create a cursor object to execute SQL commands
 
         # Log the successful connection
         logger.debug(f"Connected to database at {db_path}.")
 
-        # Create the 'downtime' table if it doesn't already exist
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS downtime (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                interface TEXT NOT NULL,
-                down_time TEXT NOT NULL,
-                up_time TEXT,
-                duration INTEGER
-            )
-        ''')
-
-        # Commit the transaction to save changes
-        conn.commit()
+        # Look up which schema objects already exist with a single catalog read
+        placeholders = ', '.join('?' for _ in SCHEMA)
+        existing = {row[0] for row in c.execute(
+            f"SELECT name FROM sqlite_master WHERE name IN ({placeholders})",
+            [name for name, _ in SCHEMA])}
+
+        # Convert a table created by an older version that stored TEXT timestamps
+        if 'downtime' in existing:
+            migrate_text_timestamps(conn, logger)
+
+        # Only create what is missing; on an already initialized database this skips
+        # the schema write lock entirely
+        missing = [(name, sql) for name, sql in SCHEMA if name not in existing]
+        if missing:
+            with transaction(conn):
+                for name, sql in missing:
+                    c.execute(sql)
+                    logger.debug(f"Created '{name}' in the database at {db_path}.")
 
         # Close the database connection
         conn.close()
@@ -160,14 +174,22 @@ def initialize_database(db_path):
 # ===========================
 
 if __name__ == "__main__":
-    # Determine which database path to use based on USB availability
-    if Path(USB_MOUNT_POINT).exists():
+    # Attach a queue-backed file handler to the 'init_db' logger, capturing all levels of log messages
+    # when logging to the USB memory stick (init_db_usb.log) and WARNING and above on microSD (init_db_sd.log)
+    get_logger('init_db', logging.DEBUG)
+
+    if USB_AVAILABLE:
+        print("Logging to USB memory stick.")
+    else:
+        print(f"WARNING: USB memory stick is not mounted at {USB_MOUNT_POINT}. Logging to microSD card.")
+
+    # storage has already selected the database path based on USB availability
+    if USB_AVAILABLE:
         # USB is mounted; initialize the database on USB
         print("USB is mounted. Using USB for database and logs.")
         logger.debug("USB is mounted. Using USB for database and logs.")
-        initialize_database(DB_PATH_USB)
     else:
         # USB is not mounted; initialize the database on microSD
         print("USB is not mounted. Using microSD for database and logs.")
         logger.debug("USB is not mounted. Using microSD for database and logs.")
-        initialize_database(DB_PATH_SD)
+    initialize_database(DB_PATH)
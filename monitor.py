@@ -1,12 +1,23 @@
 # monitor.py
 import os
+import atexit
+import signal
 import sqlite3
 import logging
-from pathlib import Path
-from datetime import datetime
-import subprocess
+from datetime import date, datetime, timedelta
+import asyncio
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from twilio.rest import Client
+from storage import DB_PATH, get_logger, connect, transaction, checkpoint_and_close
+from init_db import initialize_database
+
+# icmplib is optional; without it connectivity is probed with TCP connects
+try:
+    import icmplib
+except ImportError:
+    icmplib = None
 
 # ===========================
 # Configuration and Setup
@@ -15,91 +26,86 @@ from twilio.rest import Client
 # Configuration
 CHECK_INTERVAL = 5  # in seconds
 
-# Define the mount point for the USB memory stick
-USB_MOUNT_POINT = '/mnt/usb'
+# Hosts probed on every check: the Firewall F40 LAN IP, then an external IP to confirm internet connectivity
+PROBE_TARGETS = (('192.168.1.99', 53), ('8.8.8.8', 53))
+PROBE_TIMEOUT = 1  # in seconds
 
-# Define the directory within your project to store log files
-PROJECT_LOGS_DIR = os.path.expanduser('~/projects/network-monitoring/logs')
+# Outages are written as one row on recovery; one lasting longer than this is written as an open record
+OPEN_OUTAGE_FLUSH_AFTER = 300  # in seconds
 
-# Define the paths for the SQLite database on both USB and microSD card
-DB_PATH_USB = os.path.join(USB_MOUNT_POINT, 'downtime_logs.db')  # Database path on USB
-DB_PATH_SD = os.path.join(PROJECT_LOGS_DIR, 'downtime_logs.db')  # Database path on microSD
+# An open record left by a previous run is only resumed if its outage started this recently;
+# older ones span a long stop of the monitor, so their real end and duration are unknown
+RESUME_OPEN_OUTAGE_WITHIN = OPEN_OUTAGE_FLUSH_AFTER + 6 * CHECK_INTERVAL  # in seconds
 
-# Define the paths for the log files on both USB and microSD card
-LOG_PATH_USB = os.path.join(PROJECT_LOGS_DIR, 'monitor_usb.log')  # Log file on USB
-LOG_PATH_SD = os.path.join(PROJECT_LOGS_DIR, 'monitor_sd.log')    # Log file on microSD
+# Raw downtime records older than this are deleted; the same rollup summarizes them into downtime_daily first
+RETENTION_DAYS = 90
 
-# ===========================
-# Ensure Logs Directory Exists
-# ===========================
+# Number of attempts for a database write that fails because the database is locked
+_RETRY_ATTEMPTS = 7
 
-# Create the logs directory within the project if it doesn't already exist
-Path(PROJECT_LOGS_DIR).mkdir(parents=True, exist_ok=True)
+# Format used to render timestamps in log and SMS messages
+_FMT = '%Y-%m-%d %H:%M:%S'
 
 # ===========================
 # Configure Logging
 # ===========================
 
-# Initialize a logger with the name 'monitor'
-logger = logging.getLogger('monitor')
-logger.setLevel(logging.INFO)  # Set the logging level to INFO
+# Initialize a queue-backed logger with the name 'monitor', writing to monitor_usb.log or monitor_sd.log
+logger = get_logger('monitor', logging.INFO)
 
 # ===========================
-# Create Logging Handlers Based on USB Availability
+# Database Connection
 # ===========================
 
-if Path(USB_MOUNT_POINT).exists():
-    # USB is mounted and available
-
-    # Define the log file path on the USB
-    usb_log_file = LOG_PATH_USB
-
-    # Create a FileHandler to write logs to the USB log file
-    usb_log_handler = logging.FileHandler(usb_log_file)
-    usb_log_handler.setLevel(logging.INFO)
-
-    # Add the USB FileHandler to the logger
-    logger.addHandler(usb_log_handler)
-
-    # Log an informational message indicating that logging is directed to the USB
-    logger.info("Logging to USB memory stick.")
-else:
-    # USB is not mounted; fallback to logging on the microSD card
-
-    # Define the log file path on the microSD card
-    sd_log_file = LOG_PATH_SD
-
-    # Create a FileHandler to write logs to the microSD log file
-    sd_log_handler = logging.FileHandler(sd_log_file)
-    sd_log_handler.setLevel(logging.WARNING)
-
-    # Add the microSD FileHandler to the logger
-    logger.addHandler(sd_log_handler)
-
-    # Log a warning message indicating that USB is unavailable and logging is on microSD
-    logger.warning(f"USB mount point {USB_MOUNT_POINT} does not exist. Logging to microSD card.")
-
-# ===========================
-# Set Formatter for All Handlers
-# ===========================
-
-# Define the format for log messages, including timestamp, log level, and message
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
-# Apply the formatter to all handlers attached to the logger
-for handler in logger.handlers:
-    handler.setFormatter(formatter)
-
-# ===========================
-# Determine the Correct Database Path
-# ===========================
-
-if Path(USB_MOUNT_POINT).exists():
-    # USB is mounted; use the database path on USB
-    DB_PATH = DB_PATH_USB
-else:
-    # USB is not mounted; use the database path on microSD
-    DB_PATH = DB_PATH_SD
+# SQL statements used by the monitor; kept constant so sqlite3's statement cache is reused
+_INSERT_SQL = '''
+    INSERT INTO downtime (interface, down_time, up_time, duration)
+    VALUES (?, ?, ?, ?)
+'''
+_UPDATE_SQL = '''
+    UPDATE downtime
+    SET up_time = ?, duration = ?
+    WHERE id = ?
+'''
+
+# Latest outage left open by a previous run, found through the partial index on open outages
+_OPEN_OUTAGE_SQL = '''
+    SELECT id, down_time
+    FROM downtime
+    WHERE interface = ? AND up_time IS NULL AND down_time >= ?
+    ORDER BY id DESC
+    LIMIT 1
+'''
+
+# Close stale open outages; up_time records when they were closed, and the duration
+# is left NULL because the actual end of the outage was never observed
+_CLOSE_STALE_SQL = '''
+    UPDATE downtime
+    SET up_time = ?
+    WHERE interface = ? AND up_time IS NULL AND down_time < ?
+'''
+
+# Summarize every complete day still present in the raw table into downtime_daily, including
+# days about to be pruned; days already pruned have no raw rows left, so their summary is kept
+_ROLLUP_SQL = '''
+    INSERT OR REPLACE INTO downtime_daily (day, count, total_duration)
+    SELECT date(down_time, 'unixepoch', 'localtime'), COUNT(*), COALESCE(SUM(duration), 0)
+    FROM downtime
+    WHERE down_time < ?
+    GROUP BY date(down_time, 'unixepoch', 'localtime')
+'''
+_PRUNE_SQL = '''
+    DELETE FROM downtime
+    WHERE down_time < ?
+'''
+
+# Hold a single connection for the lifetime of the process instead of reconnecting per event
+# The connection may be used from any thread; _CONN_LOCK serializes the transactions on it
+# SQLite's busy handler is disabled (timeout=0) so a locked database is reported at once
+# and _retry's backoff alone decides how long a write waits
+_CONN = connect(DB_PATH, check_same_thread=False, timeout=0)
+_CONN_LOCK = threading.Lock()
+atexit.register(checkpoint_and_close, _CONN)
 
 # ===========================
 # Twilio Configuration
@@ -108,7 +114,9 @@ else:
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', '').strip()
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', '').strip()
 TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER', '').strip()
-RECIPIENT_PHONE_NUMBERS = os.getenv('RECIPIENT_PHONE_NUMBERS', '').split(',')
+# Comma-separated list; blanks are dropped once here rather than on every send
+RECIPIENT_PHONE_NUMBERS = [number.strip() for number in os.getenv('RECIPIENT_PHONE_NUMBERS', '').split(',')
+                           if number.strip()]
 
 # Initialize Twilio client if credentials are provided
 if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER:
@@ -127,57 +135,164 @@ else:
 # Define Functions
 # ===========================
 
-def send_sms(message):
+def _format_time(timestamp):
     """
-    Send an SMS message to multiple recipients using Twilio.
-    This function only attempts to send SMS if Twilio is enabled.
+    Format a Unix epoch timestamp as local time for log and SMS messages.
+    """
+    return datetime.fromtimestamp(timestamp).strftime(_FMT)
+
+def _send_one(number, message):
+    """
+    Send an SMS message to a single recipient using Twilio.
     If sending fails, Twilio is disabled to prevent further attempts.
     """
     global twilio_enabled  # Allow modification of the global flag
 
+    try:
+        client.messages.create(
+            body=message,
+            from_=TWILIO_PHONE_NUMBER,
+            to=number
+        )
+        logger.info(f"SMS sent to {number}: {message}")
+    except Exception as e:
+        logger.error(f"Failed to send SMS to {number}: {e}")
+        if twilio_enabled:
+            logger.warning("Disabling Twilio SMS notifications due to failure.")
+            twilio_enabled = False
+
+def send_sms(message):
+    """
+    Send an SMS message to multiple recipients using Twilio.
+    This function only attempts to send SMS if Twilio is enabled.
+    Recipients are sent to in parallel, so the alert takes one Twilio round-trip
+    rather than one per recipient. If any send fails, Twilio is disabled to
+    prevent further attempts.
+    """
     if not twilio_enabled:
         logger.warning("Twilio is not enabled. SMS not sent.")
         return
 
-    for number in RECIPIENT_PHONE_NUMBERS:
-        number = number.strip()
-        if number:
-            try:
-                client.messages.create(
-                    body=message,
-                    from_=TWILIO_PHONE_NUMBER,
-                    to=number
-                )
-                logger.info(f"SMS sent to {number}: {message}")
-            except Exception as e:
-                logger.error(f"Failed to send SMS to {number}: {e}")
-                logger.warning("Disabling Twilio SMS notifications due to failure.")
-                twilio_enabled = False
-                break  # Exit the loop to prevent further attempts
+    if not RECIPIENT_PHONE_NUMBERS:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(8, len(RECIPIENT_PHONE_NUMBERS))) as executor:
+        # Consume the results so every send completes before returning
+        list(executor.map(lambda number: _send_one(number, message), RECIPIENT_PHONE_NUMBERS))
 
-def log_downtime(interface, down_time, up_time=None, duration=None):
+def _retry(fn, *args, **kwargs):
     """
-    Log downtime events to the SQLite database.
+    Call fn, retrying with exponential backoff (10 ms doubling up to 1 s) while the
+    database is locked by another process. Any other error, or a lock that outlasts
+    all attempts, is raised to the caller. The backoff sleeps block the calling thread,
+    so the monitor loop calls the write path through asyncio.to_thread.
+    """
+    delay = 0.01
+    for attempt in range(_RETRY_ATTEMPTS):
+        try:
+            return fn(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) or attempt == _RETRY_ATTEMPTS - 1:
+                raise
+            logger.warning(f"Database is locked; retrying in {delay:.2f} seconds.")
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+def _write(sql, params):
+    """
+    Execute a single write statement and return the last inserted rowid.
+    A single statement is atomic on its own, so it runs in autocommit mode without
+    an explicit BEGIN/COMMIT; multi-statement writes use transaction() instead.
+    """
+    with _CONN_LOCK:
+        return _CONN.execute(sql, params).lastrowid
+
+def close_stale_outages(interface, before):
+    """
+    Close the open downtime records for the interface whose outage started before the
+    given time, without a duration. These were left open by a run that stopped during
+    an outage and did not restart soon enough to tell when the outage ended.
+
+    Returns:
+    - int: The number of records closed, or None if the update failed.
+    """
+    try:
+        def write_close():
+            with _CONN_LOCK:
+                return _CONN.execute(_CLOSE_STALE_SQL, (int(time.time()), interface, before)).rowcount
+
+        closed = _retry(write_close)
+        if closed:
+            logger.warning(f"Closed {closed} stale open {interface} outage record(s) without a duration.")
+        return closed
+    except sqlite3.Error as e:
+        # Log any SQLite-specific errors that occur during the update
+        logger.error(f"SQLite error occurred while closing stale downtime: {e}")
+    except Exception as e:
+        # Log any other unexpected errors
+        logger.error(f"An unexpected error occurred while closing stale downtime: {e}")
+
+def find_open_outage(interface, since):
+    """
+    Find the most recent downtime record for the interface that has no up_time yet and
+    started at or after the given time, i.e. an outage that was still ongoing when a
+    previous run stopped shortly before.
+
+    Returns:
+    - tuple: (rowid, down_time) of the open record, or None if there is none.
     """
     try:
-        # Connect to the SQLite database at the determined path
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
+        with _CONN_LOCK:
+            return _CONN.execute(_OPEN_OUTAGE_SQL, (interface, since)).fetchone()
+    except sqlite3.Error as e:
+        # Log any SQLite-specific errors that occur during the lookup
+        logger.error(f"SQLite error occurred while looking up open downtime: {e}")
 
-        # Insert a new record into the 'downtime' table
-        c.execute('''
-            INSERT INTO downtime (interface, down_time, up_time, duration)
-            VALUES (?, ?, ?, ?)
-        ''', (interface, down_time, up_time, duration))
+def rollup_old():
+    """
+    Summarize downtime for every complete day before yesterday into the 'downtime_daily'
+    table, then delete raw records older than RETENTION_DAYS. Both run in one transaction,
+    so a record is never deleted without its day having been summarized.
+    """
+    try:
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        # Yesterday is still read from the raw table, so only earlier days are summarized
+        rollup_before = int((midnight - timedelta(days=1)).timestamp())
+        prune_before = int((midnight - timedelta(days=RETENTION_DAYS)).timestamp())
 
-        # Commit the transaction to save changes
-        conn.commit()
+        def write_rollup():
+            with _CONN_LOCK, transaction(_CONN):
+                # Summarize before pruning, so every deleted record is already counted in downtime_daily
+                _CONN.execute(_ROLLUP_SQL, (rollup_before,))
+                return _CONN.execute(_PRUNE_SQL, (prune_before,)).rowcount
 
-        # Close the database connection
-        conn.close()
+        pruned = _retry(write_rollup)
 
-        # Log an informational message indicating successful logging
-        logger.info(f"Logged downtime for {interface}.")
+        logger.info(f"Rolled up daily downtime and pruned {pruned} records older than {RETENTION_DAYS} days.")
+    except sqlite3.Error as e:
+        # Log any SQLite-specific errors that occur during the operation
+        logger.error(f"SQLite error occurred while rolling up downtime: {e}")
+    except Exception as e:
+        # Log any other unexpected errors
+        logger.error(f"An unexpected error occurred while rolling up downtime: {e}")
+
+def log_downtime(interface, down_time, up_time=None, duration=None):
+    """
+    Log downtime events to the SQLite database.
+
+    Returns:
+    - int: The rowid of the inserted record, or None if the insert failed.
+    """
+    try:
+        # Insert a new record into the 'downtime' table, retrying while the database is locked
+        rowid = _retry(_write, _INSERT_SQL, (interface, down_time, up_time, duration))
+
+        # Log a debug message indicating successful logging; the level check
+        # skips building the record entirely when DEBUG is filtered out
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Logged downtime for %s.", interface)
+
+        return rowid
     except sqlite3.Error as e:
         # Log any SQLite-specific errors that occur during the operation
         logger.error(f"SQLite error occurred while logging downtime: {e}")
@@ -185,27 +300,68 @@ def log_downtime(interface, down_time, up_time=None, duration=None):
         # Log any other unexpected errors
         logger.error(f"An unexpected error occurred while logging downtime: {e}")
 
-def check_connectivity():
+def log_downtime_batch(events):
     """
-    Check connectivity by pinging the Firewall F40 and a reliable external host.
-    Returns True if both are online, False otherwise.
-    """
-    interface = 'eth0'  # Replace with 'wlan0' if using Wi-Fi
-    firewall_ip = '192.168.1.99'  # Firewall LAN IP
-    external_ip = '8.8.8.8'  # External IP to confirm internet connectivity
+    Log several downtime events to the SQLite database in a single transaction,
+    so the batch pays for one commit instead of one per row.
 
+    Parameters:
+    - events (iterable): (interface, down_time, up_time, duration) tuples.
+    """
     try:
-        # Ping the Firewall directly
-        subprocess.check_output(['ping', '-c', '1', '-I', interface, firewall_ip])
+        # Materialize the events so a retried attempt inserts the same rows
+        events = list(events)
 
-        # Ping the external IP to confirm internet connectivity
-        subprocess.check_output(['ping', '-c', '1', '-I', interface, external_ip])
+        # Wrap all inserts in one BEGIN/COMMIT, retrying while the database is locked
+        def write_batch():
+            with _CONN_LOCK, transaction(_CONN):
+                _CONN.executemany(_INSERT_SQL, events)
 
+        _retry(write_batch)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Logged a batch of downtime events.")
+    except sqlite3.Error as e:
+        # Log any SQLite-specific errors that occur during the operation
+        logger.error(f"SQLite error occurred while logging downtime batch: {e}")
+    except Exception as e:
+        # Log any other unexpected errors
+        logger.error(f"An unexpected error occurred while logging downtime batch: {e}")
+
+async def _probe(host, port=53, timeout=PROBE_TIMEOUT):
+    """
+    Probe a host without spawning a ping process.
+    Sends a single unprivileged ICMP echo when icmplib is installed and the system
+    allows it; otherwise makes a single TCP connect. A refused connection still
+    proves the host answered, so it counts as reachable.
+    """
+    if icmplib is not None:
+        try:
+            host_result = await icmplib.async_ping(host, count=1, timeout=timeout, privileged=False)
+            return host_result.is_alive
+        except icmplib.ICMPLibError:
+            # Unprivileged ICMP sockets are not permitted here (see net.ipv4.ping_group_range)
+            pass
+
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except ConnectionRefusedError:
         return True
-    except subprocess.CalledProcessError:
+    except (OSError, asyncio.TimeoutError):
         return False
+    writer.close()
+    return True
+
+async def check_connectivity():
+    """
+    Check connectivity by probing the Firewall F40 and a reliable external host.
+    Returns True if both are online, False otherwise.
+    """
+    # Probe all targets concurrently so a check takes one probe's time rather than their sum
+    results = await asyncio.gather(*(_probe(host, port) for host, port in PROBE_TARGETS))
+    return all(results)
 
-def monitor():
+async def monitor():
     """
     Continuously monitor network connectivity and log downtimes.
     """
@@ -215,75 +371,122 @@ def monitor():
     # Initialize state variables
     is_down = False  # Indicates current network status (False = online, True = offline)
     down_time = None  # Stores the timestamp when the network went down
+    down_mono = None  # Stores the monotonic clock reading when the network went down
+    down_rowid = None  # Stores the rowid of the downtime record being tracked
+
+    # Database writes and SMS sends run in a worker thread via asyncio.to_thread, so _retry's
+    # backoff sleeps and Twilio's blocking HTTPS calls never stall the probes or SIGTERM handling
+
+    # Resume an outage left open by a previous run that stopped shortly before, so its record
+    # is closed on recovery; older open records are closed now, without a duration or an SMS
+    resume_since = int(time.time()) - RESUME_OPEN_OUTAGE_WITHIN
+    await asyncio.to_thread(close_stale_outages, interface, resume_since)
+    open_outage = find_open_outage(interface, resume_since)
+    if open_outage is not None:
+        is_down = True
+        down_rowid, down_time = open_outage
+        # Reconstruct the monotonic start from the elapsed wall-clock time
+        down_mono = time.monotonic() - max(0, time.time() - down_time)
+        logger.warning(f"Resuming {interface} outage that started at {_format_time(down_time)}.")
+
+    # Schedule checks on a fixed monotonic cadence so probe and database time don't cause drift
+    next_tick = time.monotonic()
+
+    rollup_date = None  # Stores the local date of the last daily rollup
 
     while True:
+        # Summarize the previous days once per local day, including on startup
+        if rollup_date != date.today():
+            rollup_date = date.today()
+            await asyncio.to_thread(rollup_old)
+
         # Check current network connectivity status
-        online = check_connectivity()
+        online = await check_connectivity()
 
         if not online and not is_down:
             # Network has just gone down
 
             is_down = True  # Update state to indicate downtime
-            down_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # Record downtime start
+            down_time = int(time.time())  # Record downtime start as Unix epoch seconds
+            down_mono = time.monotonic()  # Used for the duration, unaffected by clock steps
+            down_str = _format_time(down_time)
 
             # Log a warning indicating the network is down
-            logger.warning(f"{interface} is down at {down_time}.")
+            logger.warning(f"{interface} is down at {down_str}.")
 
-            # Log the downtime event in the SQLite database
-            log_downtime(interface, down_time)
+            # The downtime record is not written yet; it is inserted once, fully populated,
+            # when the network recovers (or as an open record if the outage drags on)
+            down_rowid = None
 
             # Send SMS notification about downtime
-            send_sms(f"Alert: {interface} is down as of {down_time}.")
+            await asyncio.to_thread(send_sms, f"Alert: {interface} is down as of {down_str}.")
 
         elif online and is_down:
             # Network has just come back up
 
             is_down = False  # Update state to indicate network is back online
-            up_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # Record uptime
-            # Calculate the duration of downtime in seconds
-            duration = int((datetime.strptime(up_time, '%Y-%m-%d %H:%M:%S') -
-                            datetime.strptime(down_time, '%Y-%m-%d %H:%M:%S')).total_seconds())
+            up_time = int(time.time())  # Record uptime as Unix epoch seconds
+            up_str = _format_time(up_time)
+            # Calculate the duration of downtime in seconds from the monotonic clock, so an
+            # NTP correction during the outage can't produce a wrong or negative duration
+            duration = int(time.monotonic() - down_mono)
 
             # Log an informational message indicating the network is back up
-            logger.info(f"{interface} is back up at {up_time}. Downtime duration: {duration} seconds.")
-
-            # Attempt to update the existing downtime record with up_time and duration
-            try:
-                # Connect to the SQLite database
-                conn = sqlite3.connect(DB_PATH)
-                c = conn.cursor()
-
-                # Update the latest downtime record where up_time is NULL
-                c.execute('''
-                    UPDATE downtime
-                    SET up_time = ?, duration = ?
-                    WHERE interface = ? AND up_time IS NULL
-                    ORDER BY id DESC
-                    LIMIT 1
-                ''', (up_time, duration, interface))
-
-                # Commit the transaction to save changes
-                conn.commit()
-
-                # Close the database connection
-                conn.close()
-            except sqlite3.Error as e:
-                # Log any SQLite-specific errors that occur during the update
-                logger.error(f"SQLite error occurred while updating downtime: {e}")
-            except Exception as e:
-                # Log any other unexpected errors
-                logger.error(f"An unexpected error occurred while updating downtime: {e}")
+            logger.info(f"{interface} is back up at {up_str}. Downtime duration: {duration} seconds.")
+
+            if down_rowid is None:
+                # Short outage: write the whole event as a single row
+                await asyncio.to_thread(log_downtime, interface, down_time, up_time, duration)
+            else:
+                # Attempt to update the open downtime record with up_time and duration
+                try:
+                    # Update the downtime record by its rowid (a primary-key lookup, not a table scan)
+                    await asyncio.to_thread(_retry, _write, _UPDATE_SQL, (up_time, duration, down_rowid))
+                except sqlite3.Error as e:
+                    # Log any SQLite-specific errors that occur during the update
+                    logger.error(f"SQLite error occurred while updating downtime: {e}")
+                except Exception as e:
+                    # Log any other unexpected errors
+                    logger.error(f"An unexpected error occurred while updating downtime: {e}")
 
             # Send SMS notification about restoration
-            send_sms(f"Info: {interface} is back up as of {up_time}. Downtime duration: {duration} seconds.")
-
-        # Wait for a specified interval before performing the next connectivity check
-        time.sleep(CHECK_INTERVAL)  # Pause for CHECK_INTERVAL seconds
+            await asyncio.to_thread(send_sms, f"Info: {interface} is back up as of {up_str}. "
+                                              f"Downtime duration: {duration} seconds.")
+
+        elif is_down and down_rowid is None and time.monotonic() - down_mono >= OPEN_OUTAGE_FLUSH_AFTER:
+            # Outage is still ongoing; record it as open so a crash or restart doesn't lose the event
+            down_rowid = await asyncio.to_thread(log_downtime, interface, down_time)
+
+        # Wait for the remainder of the interval before performing the next connectivity check
+        next_tick += CHECK_INTERVAL
+        now = time.monotonic()
+        if next_tick < now:
+            # The iteration overran the interval; resynchronize instead of running back-to-back checks
+            next_tick = now
+        await asyncio.sleep(next_tick - now)
+
+async def main():
+    """
+    Run the monitor until the process receives SIGTERM.
+    systemd stops the service with SIGTERM, whose default action ends the process without
+    running the atexit handlers that checkpoint the WAL and flush the queued log records.
+    Cancelling the monitor task instead lets the process exit normally; the task is only
+    cancelled at an await, never in the middle of a database write.
+    """
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        await monitor()
+    except asyncio.CancelledError:
+        logger.info("Received SIGTERM. Stopping the monitor.")
 
 # ===========================
 # Entry Point
 # ===========================
 
 if __name__ == "__main__":
+    # Create any missing schema objects and migrate a database left by an older version
+    # before the first write, so an upgrade only needs a service restart
+    initialize_database(DB_PATH, logger)
+
     # Start the monitoring process when the script is executed directly
-    monitor()
+    asyncio.run(main())
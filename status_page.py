@@ -1,36 +1,33 @@
 # status_page.py
 
 from flask import Flask, render_template
-import sqlite3
-from pathlib import Path
+from flask_caching import Cache
 import os
-from datetime import datetime, timedelta
+import sqlite3
+from datetime import date, datetime, timedelta
 import logging
+from logging.handlers import RotatingFileHandler
+import threading
+from storage import USB_AVAILABLE, PROJECT_LOGS_DIR, DB_PATH, connect, start_queue_logging
 
 app = Flask(__name__)
 
-# ===========================
-# Configuration
-# ===========================
-
-USB_MOUNT_POINT = '/mnt/usb'
-PROJECT_LOGS_DIR = os.path.expanduser('~/projects/network-monitoring/logs')
-DB_PATH_USB = os.path.join(USB_MOUNT_POINT, 'downtime_logs.db')
-DB_PATH_SD = os.path.join(PROJECT_LOGS_DIR, 'downtime_logs.db')
+# Cache rendered pages in process memory; the statistics only change on outage events
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 30})
 
 # ===========================
 # Logging Configuration
 # ===========================
 
-# Ensure the logs directory exists
-os.makedirs(PROJECT_LOGS_DIR, exist_ok=True)
+# Configure logging; storage has already ensured the logs directory exists
+# Records are queued by request threads and written by a background listener,
+# so requests never block on the log file; the file rotates at 1 MB
+log_handler = RotatingFileHandler(os.path.join(PROJECT_LOGS_DIR, 'status_page.log'),
+                                  maxBytes=1_000_000, backupCount=3)
+log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s:%(message)s'))
 
-# Configure logging
-logging.basicConfig(
-    filename=os.path.join(PROJECT_LOGS_DIR, 'status_page.log'),
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s:%(message)s'
-)
+logging.getLogger().setLevel(logging.INFO)
+start_queue_logging(logging.getLogger(), log_handler)
 
 # Log that the application has started
 logging.info("Starting Network Status Webpage Flask Application")
@@ -39,126 +36,188 @@ logging.info("Starting Network Status Webpage Flask Application")
 # Determine the Correct Database Path
 # ===========================
 
-if Path(USB_MOUNT_POINT).exists():
-    DB_PATH = DB_PATH_USB
-    logging.info(f"Using USB database path: {DB_PATH_USB}")
+# storage has already selected the database path based on USB availability
+if USB_AVAILABLE:
+    logging.info(f"Using USB database path: {DB_PATH}")
 else:
-    DB_PATH = DB_PATH_SD
-    logging.info(f"Using SD database path: {DB_PATH_SD}")
+    logging.info(f"Using SD database path: {DB_PATH}")
+
+# Per-thread storage for the read-only database connection
+_thread_local = threading.local()
+
+# ===========================
+# Define Queries
+# ===========================
+
+# Periods shown on the status page, in display order, as name -> (label, window)
+# Each window function maps (now, midnight today) to the period's (start, end)
+PERIOD_SPECS = {
+    # Today: From midnight to now
+    'today': ('Today', lambda now, midnight: (midnight, now)),
+    # Last Day: From midnight of yesterday to midnight today
+    'last_day': ('Last Day', lambda now, midnight: (midnight - timedelta(days=1), midnight)),
+    # Last Week: From midnight 7 days ago to midnight yesterday
+    'last_week': ('Last Week', lambda now, midnight: (midnight - timedelta(weeks=1),
+                                                      midnight - timedelta(days=1))),
+    # Last Month: From midnight 30 days ago to midnight 7 days ago
+    'last_month': ('Last Month', lambda now, midnight: (midnight - timedelta(days=30),
+                                                        midnight - timedelta(weeks=1))),
+}
+PERIODS = tuple(PERIOD_SPECS)
+
+# Recent periods are read from the raw downtime table; older, complete days
+# are read from the downtime_daily summary maintained by the monitor
+RAW_PERIODS = ('today', 'last_day')
+DAILY_PERIODS = ('last_week', 'last_month')
+
+# Count and total duration for every raw period in one pass, using conditional aggregation
+_STATS_SQL = '''
+    SELECT {columns}
+    FROM downtime
+    WHERE down_time >= ? AND down_time < ?
+'''.format(columns=',\n           '.join(
+    'COUNT(CASE WHEN down_time >= ? AND down_time < ? THEN 1 END), '
+    'COALESCE(SUM(CASE WHEN down_time >= ? AND down_time < ? THEN duration END), 0)'
+    for _ in RAW_PERIODS))
+
+# The same for every summarized period, over at most one row per day
+_DAILY_STATS_SQL = '''
+    SELECT {columns}
+    FROM downtime_daily
+    WHERE day >= ? AND day < ?
+'''.format(columns=',\n           '.join(
+    'COALESCE(SUM(CASE WHEN day >= ? AND day < ? THEN count END), 0), '
+    'COALESCE(SUM(CASE WHEN day >= ? AND day < ? THEN total_duration END), 0)'
+    for _ in DAILY_PERIODS))
 
 # ===========================
 # Define Functions
 # ===========================
 
-def get_uptime_stats(period='today'):
+def get_read_conn():
+    """
+    Return this thread's read-only database connection, opening it on first use.
+    The connection is kept for the lifetime of the worker thread instead of being
+    reopened for every query.
+
+    Returns:
+    - sqlite3.Connection: The thread's read-only connection.
+    """
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is None:
+        conn = connect(DB_PATH, readonly=True)
+        _thread_local.conn = conn
+    return conn
+
+def _windows():
+    """
+    Compute the time window of every period once, relative to the current time.
+
+    Returns:
+    - dict: Maps each period to a (start, end) tuple of Unix epoch seconds,
+      matching the database's timestamp format
+    """
+    now = datetime.now()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return {period: tuple(int(t.timestamp()) for t in window(now, midnight))
+            for period, (_, window) in PERIOD_SPECS.items()}
+
+def _query_stats(c, sql, periods, windows):
     """
-    Retrieve uptime statistics from the database based on the specified period.
+    Run a conditional-aggregation statistics query covering several periods.
 
     Parameters:
-    - period (str): 'today', 'last_day', 'last_week', or 'last_month'
+    - c (sqlite3.Cursor): The cursor to execute the query with.
+    - sql (str): The query, with count and duration columns for each period in order.
+    - periods (tuple): The periods covered by the query.
+    - windows (dict): Maps each period to its (start, end) bounds.
+
+    Returns:
+    - dict: Maps each period to its number of incidents and total downtime
+    """
+    # Bind each period's window twice: once for the count, once for the duration
+    params = []
+    for period in periods:
+        start, end = windows[period]
+        params += [start, end, start, end]
+
+    # Bound the whole query by the widest range so the index limits the scan
+    params += [min(windows[period][0] for period in periods),
+               max(windows[period][1] for period in periods)]
+
+    c.execute(sql, params)
+    result = c.fetchone()
+
+    stats = {}
+    for i, period in enumerate(periods):
+        count, total_duration = result[2 * i], result[2 * i + 1]
+        stats[period] = {
+            'count': count,
+            # Ensure total_duration is an integer
+            'total_duration': int(total_duration) if total_duration else 0
+        }
+    return stats
+
+def get_uptime_stats():
+    """
+    Retrieve uptime statistics for every period from the database. Recent periods are
+    counted from the raw records and older ones from the daily summary, one query each.
 
     Returns:
-    - dict: Statistics including total downtime and number of incidents
+    - dict: Maps each period ('today', 'last_day', 'last_week', 'last_month') to a dict
+      of statistics including total downtime and number of incidents
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-
-        now = datetime.now()
-
-        if period == 'today':
-            # Today: From midnight to now
-            start_time = datetime(now.year, now.month, now.day)
-            end_time = now
-        elif period == 'last_day':
-            # Last Day: From midnight of yesterday to midnight today
-            start_time = datetime(now.year, now.month, now.day) - timedelta(days=1)
-            end_time = datetime(now.year, now.month, now.day)
-        elif period == 'last_week':
-            # Last Week: From midnight 7 days ago to midnight yesterday
-            start_time = datetime(now.year, now.month, now.day) - timedelta(weeks=1)
-            end_time = datetime(now.year, now.month, now.day) - timedelta(days=1)
-        elif period == 'last_month':
-            # Last Month: From midnight 30 days ago to midnight 7 days ago
-            start_time = datetime(now.year, now.month, now.day) - timedelta(days=30)
-            end_time = datetime(now.year, now.month, now.day) - timedelta(weeks=1)
-        else:
-            logging.warning(f"Invalid period specified: {period}")
-            return {}
-
-        # Format times to match the database's datetime format
-        start_str = start_time.strftime('%Y-%m-%d %H:%M:%S')
-        end_str = end_time.strftime('%Y-%m-%d %H:%M:%S')
-
-        # Execute the query for the specified period
-        c.execute('''
-            SELECT COUNT(*) as count, COALESCE(SUM(duration), 0) as total_duration
-            FROM downtime
-            WHERE down_time >= ? AND down_time < ?
-        ''', (start_str, end_str))
+        c = get_read_conn().cursor()
 
-        result = c.fetchone()
-        count, total_duration = result
+        windows = _windows()
 
-        # Ensure total_duration is an integer
-        total_duration = int(total_duration) if total_duration else 0
+        stats = {}
+        stats.update(_query_stats(c, _STATS_SQL, RAW_PERIODS, windows))
 
-        conn.close()
+        # The summary table is keyed by local date; a window boundary at midnight maps to that day
+        days = {period: tuple(date.fromtimestamp(ts).isoformat() for ts in windows[period])
+                for period in DAILY_PERIODS}
+        stats.update(_query_stats(c, _DAILY_STATS_SQL, DAILY_PERIODS, days))
 
-        logging.info(f"Fetched uptime stats for period '{period}': Count={count}, Total Duration={total_duration}")
+        logging.debug("Fetched uptime stats: %s", stats)
 
-        return {
-            'count': count,
-            'total_duration': total_duration
-        }
+        return stats
     except Exception as e:
         # Log the exception details
-        logging.error(f"Error fetching uptime stats for period '{period}': {e}")
-        return {
-            'count': 0,
-            'total_duration': 0
-        }
+        logging.error(f"Error fetching uptime stats: {e}")
+        return {period: {'count': 0, 'total_duration': 0} for period in PERIODS}
 
 def get_today_outages():
     """
     Retrieve detailed outage records for today.
 
     Returns:
-    - list of dict: Each dict contains 'down_time' and 'duration' of an outage.
+    - list of sqlite3.Row: Each row exposes 'down_time' and 'duration' of an outage by name.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
+        c = get_read_conn().cursor()
 
-        now = datetime.now()
-        # Today: From midnight to now
-        start_time = datetime(now.year, now.month, now.day)
-        end_time = now
+        # Rows are accessed by column name, so no per-row dict has to be built
+        c.row_factory = sqlite3.Row
 
-        start_str = start_time.strftime('%Y-%m-%d %H:%M:%S')
-        end_str = end_time.strftime('%Y-%m-%d %H:%M:%S')
+        # Today: From midnight to now
+        start_ts, end_ts = _windows()['today']
 
+        # Timestamps are stored as epoch seconds; render them in local time for display
         c.execute('''
-            SELECT down_time, duration
+            SELECT datetime(down_time, 'unixepoch', 'localtime') AS down_time, duration
             FROM downtime
             WHERE down_time >= ? AND down_time < ?
             ORDER BY down_time DESC
-        ''', (start_str, end_str))
+        ''', (start_ts, end_ts))
 
         outages = c.fetchall()
-        conn.close()
-
-        # Convert to list of dicts
-        outage_list = []
-        for outage in outages:
-            outage_list.append({
-                'down_time': outage[0],  # assuming 'down_time' is stored as string
-                'duration': outage[1]    # assuming 'duration' is integer seconds
-            })
 
-        logging.info(f"Fetched {len(outage_list)} detailed outages for today.")
+        logging.debug("Fetched %d detailed outages for today.", len(outages))
 
-        return outage_list
+        return outages
     except Exception as e:
         # Log the exception details
         logging.error(f"Error fetching detailed outages for today: {e}")
@@ -170,31 +229,37 @@ def test():
     return "Hello, World! This is a test page."
 
 @app.route('/')
+@cache.cached(timeout=30)
 def home():
     try:
-        # Fetch statistics for each period
-        stats_today = get_uptime_stats('today')
-        stats_last_day = get_uptime_stats('last_day')
-        stats_last_week = get_uptime_stats('last_week')
-        stats_last_month = get_uptime_stats('last_month')
+        # Fetch statistics for every period
+        stats = get_uptime_stats()
 
         # Fetch detailed outages for today
         today_outages = get_today_outages()
 
-        logging.info("Home page accessed and data fetched successfully.")
+        logging.debug("Home page accessed and data fetched successfully.")
+
+        # Pair each period's label with its statistics, in display order
+        period_stats = [(label, stats[period]) for period, (label, _) in PERIOD_SPECS.items()]
 
         return render_template('status.html',
-                               stats_today=stats_today,
-                               stats_last_day=stats_last_day,
-                               stats_last_week=stats_last_week,
-                               stats_last_month=stats_last_month,
+                               period_stats=period_stats,
                                today_outages=today_outages)
     except Exception as e:
         logging.error(f"Error rendering home page: {e}")
         return "An error occurred while processing your request.", 500
 
 if __name__ == '__main__':
-    try:
-        app.run(host='0.0.0.0', port=5000)
-    except Exception as e:
-        logging.critical(f"Failed to start the Flask application: {e}")
+    # The Werkzeug development server handles one request at a time; it is only
+    # used when explicitly requested. In production run: gunicorn -c gunicorn_conf.py status_page:app
+    if os.environ.get('FLASK_DEV'):
+        try:
+            app.run(host='0.0.0.0', port=5000)
+        except Exception as e:
+            logging.critical(f"Failed to start the Flask application: {e}")
+    else:
+        logging.critical("Refusing to start the development server; set FLASK_DEV=1 or run under gunicorn.")
+        print("ERROR: Run the status page with 'gunicorn -c gunicorn_conf.py status_page:app', "
+              "or set FLASK_DEV=1 to use the development server.")
+        raise SystemExit(1)
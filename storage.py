@@ -0,0 +1,184 @@
+# storage.py
+
+import os
+import atexit
+import sqlite3
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from contextlib import contextmanager
+
+# ===========================
+# Configuration and Setup
+# ===========================
+
+# Define the mount point for the USB memory stick
+USB_MOUNT_POINT = '/mnt/usb'
+
+# Check USB availability once; every module importing storage reuses this result
+# ismount() is only True when a filesystem is actually mounted there, unlike exists(),
+# which is also True for the empty mount point directory when the USB is unplugged
+USB_AVAILABLE = os.path.ismount(USB_MOUNT_POINT)
+
+# Define the directory within your project to store log files
+PROJECT_LOGS_DIR = os.path.expanduser('~/projects/network-monitoring/logs')
+
+# Define the paths for the SQLite database on both USB and microSD card
+DB_PATH_USB = os.path.join(USB_MOUNT_POINT, 'downtime_logs.db')  # Database path on USB
+DB_PATH_SD = os.path.join(PROJECT_LOGS_DIR, 'downtime_logs.db')  # Database path on microSD
+
+# ===========================
+# Ensure Logs Directory Exists
+# ===========================
+
+# Create the logs directory within the project if it doesn't already exist
+Path(PROJECT_LOGS_DIR).mkdir(parents=True, exist_ok=True)
+
+# ===========================
+# Determine the Correct Database Path
+# ===========================
+
+if USB_AVAILABLE:
+    # USB is mounted; use the database path on USB
+    DB_PATH = DB_PATH_USB
+else:
+    # USB is not mounted; use the database path on microSD
+    DB_PATH = DB_PATH_SD
+
+# Database paths already switched to WAL by this process
+_wal_enabled = set()
+
+# ===========================
+# Define Functions
+# ===========================
+
+def start_queue_logging(logger, handler):
+    """
+    Attach a QueueHandler to the logger and start a listener thread that passes
+    the queued records to the handler. The listener is stopped, flushing any
+    queued records, when the process exits.
+
+    Parameters:
+    - logger (logging.Logger): The logger whose records are queued.
+    - handler (logging.Handler): The handler that performs the actual writes.
+
+    Returns:
+    - logging.handlers.QueueListener: The started listener.
+    """
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+
+    log_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    return log_listener
+
+def get_logger(name, level=logging.INFO):
+    """
+    Create a logger that writes to '<name>_usb.log' or '<name>_sd.log' in the logs directory.
+    The logger only enqueues records; a listener thread owns the FileHandler and
+    performs the file writes, so callers never block on disk I/O.
+
+    Parameters:
+    - name (str): The logger name, also used as the log file prefix.
+    - level (int): The logging level used when logging to the USB memory stick.
+
+    Returns:
+    - logging.Logger: The configured logger.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+
+    if USB_AVAILABLE:
+        # USB is mounted and available; capture everything at the requested level
+        log_handler = logging.FileHandler(os.path.join(PROJECT_LOGS_DIR, f'{name}_usb.log'))
+        log_handler.setLevel(level)
+    else:
+        # USB is not mounted; fallback to logging WARNING and above on the microSD card
+        log_handler = logging.FileHandler(os.path.join(PROJECT_LOGS_DIR, f'{name}_sd.log'))
+        log_handler.setLevel(logging.WARNING)
+
+    # Define the format for log messages, including timestamp, log level, and message
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    # Route records through a queue drained by a background listener thread
+    start_queue_logging(logger, log_handler)
+
+    if USB_AVAILABLE:
+        # Log an informational message indicating that logging is directed to the USB
+        logger.info("Logging to USB memory stick.")
+    else:
+        # Log a warning message indicating that USB is unavailable and logging is on microSD
+        logger.warning(f"USB memory stick is not mounted at {USB_MOUNT_POINT}. Logging to microSD card.")
+
+    return logger
+
+def connect(db_path=DB_PATH, check_same_thread=True, readonly=False, timeout=30):
+    """
+    Open a connection to the SQLite database tuned for a write-heavy workload on flash storage.
+    WAL with synchronous=NORMAL avoids an fsync of a rollback journal on every commit.
+    isolation_level=None disables the sqlite3 module's implicit transactions;
+    writes manage their own transaction through transaction().
+
+    Parameters:
+    - db_path (str): The file path to the SQLite database.
+    - check_same_thread (bool): False to allow the connection to be shared between threads;
+      the caller is then responsible for serializing its use.
+    - readonly (bool): True to open the existing database file in read-only mode.
+    - timeout (float): Seconds SQLite waits on a locked database before raising
+      "database is locked"; 0 raises immediately so the caller can retry on its own schedule.
+
+    Returns:
+    - sqlite3.Connection: The open connection.
+    """
+    if readonly:
+        # Read-only connections can't change the journal mode; they rely on a writer having set WAL
+        conn = sqlite3.connect(Path(db_path).absolute().as_uri() + '?mode=ro', uri=True,
+                               isolation_level=None, timeout=timeout, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA query_only=1")
+    else:
+        conn = sqlite3.connect(db_path, isolation_level=None, timeout=timeout, check_same_thread=check_same_thread)
+
+    if not readonly and db_path != ':memory:' and db_path not in _wal_enabled:
+        # WAL mode is persisted in the database header once set, so it only
+        # needs to be requested on the first connection to each file per process
+        journal_mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()
+        if journal_mode == ('wal',):
+            _wal_enabled.add(db_path)
+        else:
+            logging.getLogger(__name__).warning(
+                f"Could not enable WAL journal mode on {db_path}; using {journal_mode[0]}.")
+
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA mmap_size=268435456")  # Serve reads from a 256 MB memory map instead of pread calls
+    conn.execute("PRAGMA cache_size=-20000")  # 20 MB page cache
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA wal_autocheckpoint=100")  # Checkpoint every ~400 KB so the WAL file stays small on flash
+    return conn
+
+def checkpoint_and_close(conn):
+    """
+    Checkpoint the WAL back into the database, truncate the WAL file to zero bytes,
+    and close the connection. Intended for clean shutdown of long-lived connections.
+    """
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except sqlite3.Error as e:
+        logging.getLogger(__name__).warning(f"Failed to checkpoint the WAL on shutdown: {e}")
+    conn.close()
+
+@contextmanager
+def transaction(conn):
+    """
+    Run the enclosed statements in one explicit transaction.
+    BEGIN IMMEDIATE takes the write lock up front, so a concurrent writer is
+    waited on at the start rather than failing with SQLITE_BUSY mid-transaction.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")